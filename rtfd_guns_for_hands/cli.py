@@ -4,7 +4,14 @@ import os
 import argparse
 import json
 import hashlib
+import threading
 import magic
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
 
 from rtfd_guns_for_hands.guns_parser import RtfdGunsForHands
 
@@ -16,6 +23,74 @@ def compute_hashes(data: bytes):
     return md5hash, sha1hash, sha256hash
 
 
+# libmagic handles are not safe to share between threads; keep one per worker.
+_thread_local = threading.local()
+
+
+def get_magic():
+    ms = getattr(_thread_local, "magic", None)
+    if ms is None:
+        ms = _thread_local.magic = magic.Magic(mime=True)
+    return ms
+
+
+# Common formats recognized from their leading bytes. These signatures are
+# specific enough that the type libmagic would report is expected to match;
+# ambiguous containers (TIFF-based raw images, OLE2, ZIP) are left to libmagic.
+MIME_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"{\\rtf", "text/rtf"),
+)
+
+
+def detect_mime(file_data) -> str:
+    head = bytes(file_data[:16])
+    for signature, mime_type in MIME_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    # python-magic hands the buffer to ctypes, which needs real bytes.
+    return get_magic().from_buffer(bytes(file_data))
+
+
+# O_BINARY only exists (and only matters) on Windows.
+WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def write_file(out_path: str, file_data):
+    # Write straight from the memory-mapped archive to a raw descriptor:
+    # no intermediate bytes object and no trip through the buffered IO layer.
+    view = memoryview(file_data)
+    fd = os.open(out_path, WRITE_FLAGS, 0o666)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def extract_file(out_path: str, file_data) -> dict:
+    """Write one extracted file to disk and return its JSON metadata."""
+    write_file(out_path, file_data)
+
+    size = len(file_data)
+    md5hash, sha1hash, sha256hash = compute_hashes(file_data)
+    mime_type = detect_mime(file_data)
+
+    return {
+        "filename": os.path.basename(out_path),
+        "full_path": out_path,
+        "size": size,
+        "md5": md5hash,
+        "sha1": sha1hash,
+        "sha256": sha256hash,
+        "mime": mime_type,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Parse RTFD guns-for-hands blocks, extract files, and output JSON metadata. https://www.youtube.com/watch?v=Pmv8aQKO6k0"
@@ -28,46 +103,55 @@ def main():
     # Parse the archive
     try:
         rtfd_parser = RtfdGunsForHands(args.input_file)
-        # flatten returns a list of tuples: (full_path, file_data)
-        flat_files = rtfd_parser.parse(flatten=True)
+        # iter_files yields FlatFile(full_path, file_data) tuples as they are consumed
+        flat_files = rtfd_parser.iter_files()
     except Exception as e:
         print(f"Error parsing RTFD file: {e}", file=sys.stderr)
         sys.exit(1)
 
     os.makedirs(args.extract_dir, exist_ok=True)
-    ms = magic.Magic(mime=True)
-
-    results = []
-    for full_path, file_data in flat_files:
-        # Construct output path: preserve directory structure under extract-dir
-        out_path = os.path.join(args.extract_dir, full_path)
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
-        with open(out_path, "wb") as f:
-            f.write(file_data)
-
-        size = len(file_data)
-        md5hash, sha1hash, sha256hash = compute_hashes(file_data)
-        mime_type = ms.from_buffer(file_data)
-
-        result = {
-            "filename": os.path.basename(out_path),
-            "full_path": out_path,
-            "size": size,
-            "md5": md5hash,
-            "sha1": sha1hash,
-            "sha256": sha256hash,
-            "mime": mime_type,
-        }
-        results.append(result)
-
-    output_json = json.dumps(results, indent=2)
+
+    # Writing, hashing and libmagic all release the GIL, so files are
+    # processed concurrently; results are collected in archive order.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = []
+        # Many files share a directory; only create each one once, up front,
+        # so workers never race on makedirs.
+        created_dirs = set()
+        # Latest future writing each output path.
+        submitted = {}
+        for flat_file in flat_files:
+            # Construct output path: preserve directory structure under extract-dir
+            out_path = os.path.join(args.extract_dir, flat_file.full_path)
+            out_dir = os.path.dirname(out_path)
+            if out_dir not in created_dirs:
+                os.makedirs(out_dir, exist_ok=True)
+                created_dirs.add(out_dir)
+            if out_path in submitted:
+                # Never write one path from two workers at once; waiting keeps
+                # the old behaviour of the later entry overwriting the earlier.
+                submitted[out_path].result()
+            future = executor.submit(extract_file, out_path, flat_file.file_data)
+            submitted[out_path] = future
+            futures.append(future)
+        results = [future.result() for future in futures]
+
+    # orjson is used for the JSON file when it is installed; it still builds
+    # the document in memory, but encodes it far faster than the stdlib. The
+    # stdlib fallback streams to the file and writes the same raw UTF-8.
     if args.json_out:
-        with open(args.json_out, "w", encoding="utf-8") as jf:
-            jf.write(output_json)
+        if orjson is not None:
+            with open(args.json_out, "wb") as jf:
+                jf.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+        else:
+            with open(args.json_out, "w", encoding="utf-8") as jf:
+                json.dump(results, jf, indent=2, ensure_ascii=False)
         print(f"JSON results written to {args.json_out}")
     else:
-        print(output_json)
-
+        # stdout may be any text stream (no .buffer, unknown encoding), so it
+        # keeps the ASCII-escaped stdlib output.
+        json.dump(results, sys.stdout, indent=2)
+        print()
 
 if __name__ == "__main__":
     main()
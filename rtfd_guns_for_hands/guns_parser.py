@@ -1,10 +1,23 @@
+import mmap
 import os
+import stat
 import struct
 import io
+from typing import NamedTuple
+
+# All integers in the serialized form are little-endian 32-bit values.
+_HEADER = struct.Struct("<4s2I")
+_U32 = struct.Struct("<I")
+_U32X2 = struct.Struct("<2I")
 
 class RTFDParserError(Exception):
     pass
 
+class FlatFile(NamedTuple):
+    """A file from a flattened archive; unpacks like a (full_path, file_data) tuple."""
+    full_path: str
+    file_data: memoryview
+
 class RtfdGunsForHands:
     """
     Parser for flattened NSFileWrapper (RTFD) archives.
@@ -13,40 +26,78 @@ class RtfdGunsForHands:
     It parses the header, then recursively parses the directory structure.
     
     The `parse()` method returns a hierarchical structure.
-    If `flatten=True` is passed, it returns a list of (full_path, file_data) tuples.
+    If `flatten=True` is passed, it returns a list of FlatFile (full_path, file_data) tuples;
+    `iter_files()` yields the same entries one at a time.
+    
+    The archive is memory-mapped and parsed by offset; file data is returned
+    as memoryview slices of the mapping, so only the pages actually touched
+    are read from disk and nothing is copied. Inputs that can't be mapped,
+    such as pipes, are read into memory and sliced the same way.
     """
     
     def __init__(self, file_path: str):
         self.file_path = file_path
-        self.fd = open(file_path, "rb")
-    
-    def __del__(self):
-        if self.fd:
-            self.fd.close()
+        self.view = None
+        self.offset = 0
     
     def parse(self, flatten: bool = False):
+        if flatten:
+            return list(self.iter_files())
+        return self._parse_archive()
+    
+    def iter_files(self):
+        """
+        Parse the archive and return an iterator of FlatFile entries.
+        Parse errors are raised here, not while iterating.
+        """
+        return self._flatten(self._parse_archive())
+    
+    def _parse_archive(self):
+        self._load()
         self._parse_header()
-        parsed_directory = self._parse_directory()
-        if not flatten:
-            return parsed_directory
-        return list(self._flatten(parsed_directory))
+        return self._parse_directory()
     
     def is_valid(self) -> bool:
-        offset = self.fd.tell()
+        self._load()
+        offset = self.offset
         try:
             self._parse_header()
         except Exception:
             valid = False
         else:
             valid = True
-        self.fd.seek(offset)
+        self.offset = offset
         return valid
     
+    def _load(self):
+        """Map the archive on first use; the file itself is closed right away."""
+        if self.view is not None:
+            return
+        with open(self.file_path, "rb") as fd:
+            st = os.fstat(fd.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                # Pipes, /dev/stdin and process substitution can't be mapped
+                # (and report size 0); read them into memory instead.
+                data = fd.read()
+            elif st.st_size:
+                data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # mmap refuses empty files; they fail the header check anyway.
+                data = b""
+        # The mapping stays alive for as long as views into it are referenced.
+        self.view = memoryview(data)
+    
+    def _read(self, size: int) -> memoryview:
+        """Return the next `size` bytes (fewer at end of data) as a zero-copy view."""
+        chunk = self.view[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+    
     def _parse_header(self):
-        header = self.fd.read(12)
+        header = self._read(12)
         if len(header) < 12:
             raise RTFDParserError("Header too short")
-        magic, empty, record_type = struct.unpack("4s2I", header)
+        magic, empty, record_type = _HEADER.unpack(header)
         if magic != b"rtfd":
             raise RTFDParserError("Missing RTFD magic")
         if empty != 0:
@@ -55,23 +106,23 @@ class RtfdGunsForHands:
             raise RTFDParserError(f"Unexpected first record type {record_type}")
     
     def _parse_directory(self):
-        num_records_data = self.fd.read(4)
+        num_records_data = self._read(4)
         if len(num_records_data) < 4:
             raise RTFDParserError("Not enough data for number of records")
-        num_records, = struct.unpack("I", num_records_data)
+        num_records, = _U32.unpack(num_records_data)
         
-        keys = [self._parse_string() for i in range(num_records)]
-        lengths_data = self.fd.read(num_records * 4)
+        keys = [bytes(self._parse_string()) for i in range(num_records)]
+        lengths_data = self._read(num_records * 4)
         if len(lengths_data) < num_records * 4:
             raise RTFDParserError("Not enough data for lengths")
-        lengths = struct.unpack(f"{num_records}I", lengths_data)
+        lengths = struct.unpack(f"<{num_records}I", lengths_data)
         
         values = []
         for i in range(num_records):
-            rec_type_data = self.fd.read(4)
+            rec_type_data = self._read(4)
             if len(rec_type_data) < 4:
                 raise RTFDParserError("Not enough data for record type")
-            record_type, = struct.unpack("I", rec_type_data)
+            record_type, = _U32.unpack(rec_type_data)
             if record_type == 1:
                 values.append(self._parse_string())
             elif record_type == 3:
@@ -80,12 +131,13 @@ class RtfdGunsForHands:
                 raise RTFDParserError(f"Unknown record type {record_type}")
         
         records = dict(zip(keys, values))
-        dir_name_ascii = records.pop(b"__@PreferredName@__", b"").decode("ascii")
-        dir_name_utf8 = records.pop(b"__@UTF8PreferredName@__", b"").decode("utf-8")
+        # str() decodes the memoryview in place, without a bytes() copy first.
+        dir_name_ascii = str(records.pop(b"__@PreferredName@__", b""), "ascii")
+        dir_name_utf8 = str(records.pop(b"__@UTF8PreferredName@__", b""), "utf-8")
         dir_name = dir_name_utf8 if dir_name_utf8 else dir_name_ascii
         records.pop(b".", None)
         
-        # Each remaining key is a file; its value is the file data (raw bytes).
+        # Each remaining key is a file; its value is the file data (a memoryview).
         # We construct a list of (filename, file_data) pairs.
         directory = [(n.decode(), records[n]) for n in records]
         # Special case: if there is a single file entry named "..", return a tuple.
@@ -93,18 +145,18 @@ class RtfdGunsForHands:
             return (dir_name, directory[0][1])
         return [(dir_name, directory)]
     
-    def _parse_string(self) -> bytes:
-        length_data = self.fd.read(4)
+    def _parse_string(self) -> memoryview:
+        length_data = self._read(4)
         if len(length_data) < 4:
             raise RTFDParserError("Not enough data for string length")
-        string_length, = struct.unpack("I", length_data)
+        string_length, = _U32.unpack(length_data)
         if string_length == 0x80000000:
-            extra = self.fd.read(8)
+            extra = self._read(8)
             if len(extra) < 8:
                 raise RTFDParserError("Not enough data for padded string length")
-            string_length, padding_length = struct.unpack("2I", extra)
-            self.fd.seek(padding_length, os.SEEK_CUR)
-        s = self.fd.read(string_length)
+            string_length, padding_length = _U32X2.unpack(extra)
+            self.offset += padding_length
+        s = self._read(string_length)
         if len(s) < string_length:
             raise RTFDParserError("Truncated string")
         return s
@@ -114,7 +166,7 @@ class RtfdGunsForHands:
         Recursively flatten the directory structure.
         If obj is a tuple, then it represents (dir_name, content).
         If obj is a list, iterate over each element.
-        Otherwise, yield (base_name, obj) which should be file data.
+        Otherwise, yield FlatFile(base_name, obj); obj should be file data.
         """
         if isinstance(obj, tuple):
             full_name = os.path.join(base_name, obj[0]) if base_name else obj[0]
@@ -123,5 +175,5 @@ class RtfdGunsForHands:
             for item in obj:
                 yield from self._flatten(item, base_name)
         else:
-            yield base_name, obj
+            yield FlatFile(base_name, obj)
 
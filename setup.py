@@ -10,6 +10,9 @@ setup(
     install_requires=[
         "python-magic",
     ],
+    extras_require={
+        "orjson": ["orjson"],
+    },
     entry_points={
         "console_scripts": [
             "rtfd-guns-parse = rtfd_guns_for_hands.cli:main"
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("magic")
+
+from rtfd_guns_for_hands import cli
+
+
+def _string(data: bytes, padded: bool = False) -> bytes:
+    if padded:
+        return struct.pack("<3I", 0x80000000, len(data), 4) + b"\0" * 4 + data
+    return struct.pack("<I", len(data)) + data
+
+
+def _directory(entries) -> bytes:
+    """Serialize a directory from (key, record_type, serialized_value) entries."""
+    out = struct.pack("<I", len(entries))
+    out += b"".join(_string(key) for key, _, _ in entries)
+    out += struct.pack(f"<{len(entries)}I", *[0] * len(entries))
+    for _, record_type, value in entries:
+        out += struct.pack("<I", record_type) + value
+    return out
+
+
+def _file_wrapper(name: bytes, data: bytes) -> bytes:
+    return _directory([
+        (b"__@PreferredName@__", 1, _string(name)),
+        (b"__@UTF8PreferredName@__", 1, _string(name)),
+        (b"..", 1, _string(data, padded=True)),
+    ])
+
+
+def _archive(files) -> bytes:
+    entries = [
+        (b"__@PreferredName@__", 1, _string(b"doc.rtfd")),
+        (b"__@UTF8PreferredName@__", 1, _string(b"doc.rtfd")),
+        (b".", 1, _string(b"")),
+    ]
+    entries += [(key, 3, _file_wrapper(name, data)) for key, name, data in files]
+    return b"rtfd" + struct.pack("<2I", 0, 3) + _directory(entries)
+
+
+def test_duplicate_output_path_later_entry_wins(tmp_path, monkeypatch):
+    # Both entries flatten to doc.rtfd/p/q/r.
+    first = b"A" * (1 << 20)
+    second = b"B" * (1 << 20)
+    archive = tmp_path / "dup.rtfd"
+    archive.write_bytes(_archive([
+        (b"p", b"q/r", first),
+        (b"p/q", b"r", second),
+    ]))
+    extract_dir = tmp_path / "out"
+    json_out = tmp_path / "results.json"
+    monkeypatch.setattr(sys, "argv", [
+        "rtfd-guns-parse", str(archive),
+        "--extract-dir", str(extract_dir),
+        "--json-out", str(json_out),
+    ])
+
+    # Hold each write open briefly and record any path written by two
+    # workers at once, so a missing per-path wait fails deterministically.
+    write_file = cli.write_file
+    lock = threading.Lock()
+    active = set()
+    overlaps = []
+
+    def slow_write_file(out_path, file_data):
+        with lock:
+            if out_path in active:
+                overlaps.append(out_path)
+            active.add(out_path)
+        try:
+            time.sleep(0.2)
+            write_file(out_path, file_data)
+        finally:
+            with lock:
+                active.discard(out_path)
+
+    monkeypatch.setattr(cli, "write_file", slow_write_file)
+    # The pool is sized from the CPU count; make sure it has several workers.
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    cli.main()
+
+    assert overlaps == []
+
+    out_path = os.path.join(str(extract_dir), "doc.rtfd", "p", "q", "r")
+    with open(out_path, "rb") as f:
+        assert f.read() == second
+    results = json.loads(json_out.read_text(encoding="utf-8"))
+    assert [r["full_path"] for r in results] == [out_path, out_path]
+    assert [r["md5"] for r in results] == [
+        hashlib.md5(first).hexdigest(),
+        hashlib.md5(second).hexdigest(),
+    ]